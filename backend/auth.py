@@ -1,10 +1,15 @@
 """
 JWT authentication utilities: password hashing, token creation, and user extraction.
-Uses PyJWT for token encoding/decoding and passlib+bcrypt for password hashing.
+Uses PyJWT for token encoding/decoding and passlib (Argon2id, bcrypt legacy) for password hashing.
 """
 
+import hmac
+import secrets
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 
+from cachetools import TLRUCache, TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
@@ -18,21 +23,58 @@ from storage import get_user_by_username
 SECRET_KEY = "super-secret-key-change-in-production"  # ⚠️ Change this!
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
+TOKEN_CACHE_TTL_SECONDS = 30
 
 # ------------------------------------------------------------------
 # Password hashing
 # ------------------------------------------------------------------
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Argon2id for new hashes; existing bcrypt hashes still verify and are upgraded on login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    default="argon2",
+    argon2__type="ID",
+    argon2__memory_cost=19456,  # KiB
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+    bcrypt__rounds=10,
+    deprecated="auto",
+)
 
 
 def hash_password(password: str) -> str:
-    """Hash a plaintext password with bcrypt."""
+    """Hash a plaintext password with Argon2id."""
     return pwd_context.hash(password)
 
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if the hash uses a deprecated scheme or outdated parameters."""
+    return pwd_context.needs_update(hashed_password)
+
+
+# Recent verification results, so retries don't pay the full KDF cost again.
+# Keys are HMAC-SHA256 under a random per-process key that is never persisted.
+# Tradeoff: anyone able to read this process's memory gets the HMAC key too, and can
+# test guesses for passwords used in the last 60s at HMAC speed rather than KDF speed.
+# A leaked cache without the key (e.g. logged keys) is not brute-forceable.
+_VERIFY_CACHE_KEY = secrets.token_bytes(32)
+_verify_cache = TTLCache(maxsize=1024, ttl=60)
+_verify_cache_lock = threading.Lock()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plaintext password against a bcrypt hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify a plaintext password against a stored hash."""
+    key = hmac.new(
+        _VERIFY_CACHE_KEY, hashed_password.encode() + b"|" + plain_password.encode(), "sha256"
+    ).digest()
+    with _verify_cache_lock:
+        cached = _verify_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = pwd_context.verify(plain_password, hashed_password)
+    with _verify_cache_lock:
+        _verify_cache[key] = result
+    return result
 
 
 # ------------------------------------------------------------------
@@ -43,12 +85,31 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
     """Create a signed JWT token."""
-    to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (
         expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # Integer exp is what PyJWT would serialize anyway; skip its datetime conversion
+    return jwt.encode({**data, "exp": int(expire.timestamp())}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+# ------------------------------------------------------------------
+# Validated token cache: raw token -> (user, exp)
+# ------------------------------------------------------------------
+def _token_ttu(_token: str, value: tuple[dict, float], now: float) -> float:
+    """Expire cache entries after the TTL, or earlier if the token itself expires."""
+    return min(now + TOKEN_CACHE_TTL_SECONDS, value[1])
+
+
+_token_cache = TLRUCache(maxsize=10_000, ttu=_token_ttu, timer=time.time)
+# Subjects of validly signed tokens with no matching user, rejected without a storage lookup
+_unknown_sub_cache = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL_SECONDS)
+_token_cache_lock = threading.Lock()
+
+
+def forget_unknown_user(username: str):
+    """Drop a negative cache entry, e.g. once the username has just been registered."""
+    with _token_cache_lock:
+        _unknown_sub_cache.pop(username, None)
 
 
 # ------------------------------------------------------------------
@@ -58,7 +119,13 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     """
     FastAPI dependency that decodes the JWT token from the Authorization header
     and returns the corresponding user dict.
+    Validated tokens are cached briefly to skip re-verification and the user lookup.
     """
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+    if cached is not None:
+        return cached[0]
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -72,7 +139,16 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     except jwt.PyJWTError:
         raise credentials_exception
 
+    with _token_cache_lock:
+        if username in _unknown_sub_cache:
+            raise credentials_exception
+
     user = get_user_by_username(username)
     if user is None:
+        with _token_cache_lock:
+            _unknown_sub_cache[username] = True
         raise credentials_exception
+
+    with _token_cache_lock:
+        _token_cache[token] = (user, float(payload.get("exp", time.time())))
     return user
@@ -3,20 +3,33 @@ FastAPI application entry point.
 Includes auth and ratings routers, CORS middleware, and a health check.
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from routers.auth_router import router as auth_router
 from routers.ratings_router import router as ratings_router
-from routers.recommendations_router import router as recommendations_router
+from routers.recommendations_router import router as recommendations_router, init_ml
 from routers.movies_router import router as movies_router
+from tmdb_service import open_client, close_client
 
 # ------------------------------------------------------------------
 # App
 # ------------------------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load movies, TF-IDF and the SVD model once the server starts, not at import
+    await init_ml(app)
+    await open_client()
+    yield
+    await close_client()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Movie Recommendation API",
-    description="Hybrid movie recommendation system with JWT auth and JSON storage",
+    description="Hybrid movie recommendation system with JWT auth and SQLite storage",
     version="1.0.0",
 )
 
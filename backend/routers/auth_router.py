@@ -2,14 +2,34 @@
 Auth router: Register and Login endpoints.
 """
 
+import os
+
+import anyio
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
 
-from auth import hash_password, verify_password, create_access_token
-from storage import get_user_by_username, add_user
+from auth import (
+    hash_password,
+    verify_password,
+    password_needs_rehash,
+    create_access_token,
+    forget_unknown_user,
+)
+from storage import get_user_by_username, add_user, update_user_password
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Password hashing is CPU-bound: run it off the event loop, at most one hash per core
+_hash_limiter = anyio.CapacityLimiter(os.cpu_count() or 1)
+# Blocking SQLite calls also go to a thread, on anyio's default limiter
+
+
+async def _rehash_if_needed(user: dict, password: str):
+    """Upgrade a legacy (e.g. bcrypt) hash to the current scheme after a successful login."""
+    if password_needs_rehash(user["hashed_password"]):
+        hashed = await anyio.to_thread.run_sync(hash_password, password, limiter=_hash_limiter)
+        await anyio.to_thread.run_sync(update_user_password, user["id"], hashed)
+
 
 # ------------------------------------------------------------------
 # Request / Response schemas
@@ -35,22 +55,26 @@ class TokenResponse(BaseModel):
 # Endpoints
 # ------------------------------------------------------------------
 @router.post("/register", response_model=TokenResponse)
-def register(body: RegisterRequest):
+async def register(body: RegisterRequest):
     """Create a new user account, or log them in if they already exist."""
-    user = get_user_by_username(body.username)
+    user = await anyio.to_thread.run_sync(get_user_by_username, body.username)
     
     # If user already exists, try to log them in (verify password)
     if user:
-        if not verify_password(body.password, user["hashed_password"]):
+        if not await anyio.to_thread.run_sync(
+            verify_password, body.password, user["hashed_password"], limiter=_hash_limiter
+        ):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Username already exists, but incorrect password provided for login.",
             )
         # Password is correct -> proceed to generate token below
+        await _rehash_if_needed(user, body.password)
     else:
         # User doesn't exist -> Create user
-        hashed = hash_password(body.password)
-        user = add_user(body.username, hashed)
+        hashed = await anyio.to_thread.run_sync(hash_password, body.password, limiter=_hash_limiter)
+        user = await anyio.to_thread.run_sync(add_user, body.username, hashed)
+        forget_unknown_user(user["username"])
 
     # Generate token
     token = create_access_token(data={"sub": user["username"], "user_id": user["id"]})
@@ -63,14 +87,17 @@ def register(body: RegisterRequest):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(body: LoginRequest):
+async def login(body: LoginRequest):
     """Authenticate a user and return a JWT token."""
-    user = get_user_by_username(body.username)
-    if not user or not verify_password(body.password, user["hashed_password"]):
+    user = await anyio.to_thread.run_sync(get_user_by_username, body.username)
+    if not user or not await anyio.to_thread.run_sync(
+        verify_password, body.password, user["hashed_password"], limiter=_hash_limiter
+    ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
         )
+    await _rehash_if_needed(user, body.password)
 
     token = create_access_token(data={"sub": user["username"], "user_id": user["id"]})
 
@@ -1,14 +1,13 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from pydantic import BaseModel
 import pandas as pd
 
-from tmdb_service import search_poster, get_movie_details
-from routers.recommendations_router import movies_df  # Reuse the loaded DataFrame
+from tmdb_service import search_poster, get_posters_batch, get_movie_details
 
 router = APIRouter(prefix="/movies", tags=["Movies"])
 
 @router.get("/search")
-async def search_movies(q: str = "", limit: int = 12):
+async def search_movies(request: Request, q: str = "", limit: int = 12):
     """
     Search for movies by title (case-insensitive substring match).
     Returns the top 'limit' matches with their posters.
@@ -16,6 +15,7 @@ async def search_movies(q: str = "", limit: int = 12):
     if not q or len(q) < 2:
         return []
     
+    movies_df = request.app.state.movies_df  # Reuse the DataFrame loaded at startup
     if movies_df is None or movies_df.empty:
         raise HTTPException(status_code=500, detail="Movies data not loaded")
 
@@ -25,26 +25,25 @@ async def search_movies(q: str = "", limit: int = 12):
     
     results = []
     for _, row in matches.iterrows():
-        movie_id = int(row["movieId"])
-        title = str(row["title"])
-        
-        poster_url = await search_poster(movie_id, title)
-        
         results.append({
-            "movieId": movie_id,
-            "title": title,
+            "movieId": int(row["movieId"]),
+            "title": str(row["title"]),
             "genres": str(row["genres"]),
-            "poster_url": poster_url
         })
+
+    posters = await get_posters_batch(results)
+    for movie in results:
+        movie["poster_url"] = posters[movie["movieId"]]
         
     return results
 
 @router.get("/{movie_id}/details")
-async def get_single_movie_details(movie_id: int):
+async def get_single_movie_details(request: Request, movie_id: int):
     """
     Get full details for a single movie including TMDB enriched data
     like synopsis, runtime, and cast.
     """
+    movies_df = request.app.state.movies_df
     if movies_df is None or movies_df.empty:
         raise HTTPException(status_code=500, detail="Movies data not loaded")
         
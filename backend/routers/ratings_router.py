@@ -2,13 +2,12 @@
 Ratings router: submit single or batch ratings.
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel, Field
 
 from auth import get_current_user
 from storage import add_rating, add_ratings_batch, get_ratings_for_user, update_rating, delete_rating
-from routers.recommendations_router import movies_df
-from tmdb_service import search_poster
+from tmdb_service import get_posters_batch
 from fastapi import HTTPException, status
 
 router = APIRouter(prefix="/ratings", tags=["Ratings"])
@@ -57,21 +56,24 @@ def submit_batch_ratings(body: BatchRatingsRequest, user: dict = Depends(get_cur
 
 
 @router.get("")
-async def get_my_ratings(user: dict = Depends(get_current_user)):
+async def get_my_ratings(request: Request, user: dict = Depends(get_current_user)):
     """Get all ratings submitted by the authenticated user, enriched with poster_url and title."""
+    ml = request.app.state
     user_ratings = get_ratings_for_user(user["id"])
     
     # Enrich with movie data
     enriched_ratings = []
     for r in user_ratings:
-        mid = r["movie_id"]
-        row = movies_df[movies_df["movieId"] == mid]
-        if not row.empty:
-            title = str(row.iloc[0]["title"])
-            poster = await search_poster(mid, title)
-            r["title"] = title
-            r["poster_url"] = poster
+        idx = ml.movieid_to_idx.get(r["movie_id"])
+        if idx is not None:
+            r["title"] = str(ml.titles[idx])
             enriched_ratings.append(r)
+
+    posters = await get_posters_batch(
+        [{"movieId": r["movie_id"], "title": r["title"]} for r in enriched_ratings]
+    )
+    for r in enriched_ratings:
+        r["poster_url"] = posters[r["movie_id"]]
             
     # Sort by newest first
     enriched_ratings.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
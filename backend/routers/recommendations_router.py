@@ -8,18 +8,20 @@ Hybrid Logic:
 4. Return the Top 10 sorted by predicted SVD score
 """
 
+import json
 import os
 import pickle
 from pathlib import Path
 
+import anyio
+import numpy as np
 import pandas as pd
+from cachetools import LRUCache
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from svd_model import SVDModel  # noqa: F401 — needed for pickle to resolve the class
-import json
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Header
 
-from tmdb_service import search_poster
+from tmdb_service import get_posters_batch
 
 from auth import get_current_user
 from storage import get_ratings_for_user
@@ -27,130 +29,200 @@ from storage import get_ratings_for_user
 router = APIRouter(prefix="/recommendations", tags=["Recommendations"])
 
 # ------------------------------------------------------------------
-# Load data and model at module level (once on import / startup)
+# Data and model loading (run once at app startup, shared via app.state)
 # ------------------------------------------------------------------
 BASE_DIR = Path(__file__).parent.parent  # backend/
 MODEL_PATH = BASE_DIR / "models" / "svd_model.pkl"
+POPULAR_PATH = BASE_DIR / "data" / "popular_movies.json"
 
-# Load movies
-_movies_path = BASE_DIR / "movies.csv"
-if not _movies_path.exists():
-    _movies_path = BASE_DIR.parent / "movies.csv" # fallback for local dev
-
-if _movies_path.exists():
-    movies_df = pd.read_csv(_movies_path)
-    # Preprocess genres: replace '|' with space for TF-IDF
-    movies_df["genres_clean"] = movies_df["genres"].fillna("").str.replace("|", " ", regex=False)
-    print(f"[ML] Loaded {len(movies_df)} movies from {_movies_path}")
-else:
-    movies_df = pd.DataFrame(columns=["movieId", "title", "genres", "genres_clean"])
-    print(f"[ML] WARNING: movies.csv not found at {_movies_path}")
-
-# Build TF-IDF matrix on genres
-_tfidf = TfidfVectorizer(stop_words="english")
-_tfidf_matrix = None
-if len(movies_df) > 0 and len(movies_df["genres_clean"].str.strip().unique()) > 1:
-    try:
-        _tfidf_matrix = _tfidf.fit_transform(movies_df["genres_clean"])
-        print(f"[ML] TF-IDF matrix shape: {_tfidf_matrix.shape}")
-    except ValueError:
-        print("[ML] WARNING: Could not build TF-IDF matrix (empty vocabulary or stop words).")
-else:
-    print("[ML] WARNING: Not enough movies to build TF-IDF matrix")
-
-# Load SVD model
-svd_model = None
-if MODEL_PATH.exists():
-    with open(MODEL_PATH, "rb") as f:
-        svd_model = pickle.load(f)
-    print(f"[ML] SVD model loaded from {MODEL_PATH}")
-else:
+
+def _load_movies() -> pd.DataFrame:
+    """Load movies.csv and add the space-separated genres column used by TF-IDF."""
+    movies_path = BASE_DIR / "movies.csv"
+    if not movies_path.exists():
+        movies_path = BASE_DIR.parent / "movies.csv" # fallback for local dev
+
+    if movies_path.exists():
+        movies_df = pd.read_csv(movies_path, dtype={"movieId": np.int32})
+        # Preprocess genres: replace '|' with space for TF-IDF
+        movies_df["genres_clean"] = movies_df["genres"].fillna("").str.replace("|", " ", regex=False)
+        print(f"[ML] Loaded {len(movies_df)} movies from {movies_path}")
+    else:
+        movies_df = pd.DataFrame(columns=["movieId", "title", "genres", "genres_clean"])
+        print(f"[ML] WARNING: movies.csv not found at {movies_path}")
+    return movies_df
+
+
+def _build_tfidf(movies_df: pd.DataFrame) -> np.ndarray | None:
+    """
+    Build the TF-IDF matrix on genres, or None if there is not enough data.
+    The genre vocabulary is only ~20 terms, so the matrix is kept dense float32
+    with L2-normalized rows: cosine similarity is then a single matrix-vector product.
+    """
+    if len(movies_df) > 0 and len(movies_df["genres_clean"].str.strip().unique()) > 1:
+        try:
+            sparse = TfidfVectorizer(stop_words="english").fit_transform(movies_df["genres_clean"])
+            tfidf_matrix = sparse.toarray().astype(np.float32)
+            tfidf_matrix /= np.linalg.norm(tfidf_matrix, axis=1, keepdims=True) + 1e-12
+            print(f"[ML] TF-IDF matrix shape: {tfidf_matrix.shape}")
+            return tfidf_matrix
+        except ValueError:
+            print("[ML] WARNING: Could not build TF-IDF matrix (empty vocabulary or stop words).")
+    else:
+        print("[ML] WARNING: Not enough movies to build TF-IDF matrix")
+    return None
+
+
+def _load_svd_model():
+    """Unpickle the trained SVD model, or None if it has not been trained yet."""
+    if MODEL_PATH.exists():
+        with open(MODEL_PATH, "rb") as f:
+            model = pickle.load(f)
+        print(f"[ML] SVD model loaded from {MODEL_PATH}")
+        return model
     print(f"[ML] WARNING: SVD model not found at {MODEL_PATH}. Run train_model.py first!")
+    return None
 
-# Precompute popular movies (by average rating count from the original ratings CSV)
-import json
-_popular_path = BASE_DIR / "data" / "popular_movies.json"
-_popular_movie_ids = []
-if _popular_path.exists():
-    with open(_popular_path, "r") as f:
-        _popular_movie_ids = json.load(f)
-    print(f"[ML] Loaded {len(_popular_movie_ids)} popular movies from json")
-else:
-    print(f"[ML] WARNING: popular movies json not found at {_popular_path}")
+
+def _load_popular_movie_ids() -> list[int]:
+    """Load the precomputed popular movie ids (high average rating, many ratings)."""
+    if POPULAR_PATH.exists():
+        with open(POPULAR_PATH, "r") as f:
+            popular_movie_ids = json.load(f)
+        print(f"[ML] Loaded {len(popular_movie_ids)} popular movies from json")
+        return popular_movie_ids
+    print(f"[ML] WARNING: popular movies json not found at {POPULAR_PATH}")
+    return []
+
+
+def _load_ml_state(ml):
+    """Populate `ml` (app.state) with the movies table, lookups, TF-IDF and SVD model."""
+    ml.movies_df = _load_movies()
+
+    # Positional lookups so the hot path never scans movies_df
+    ml.movie_ids_arr = ml.movies_df["movieId"].values
+    ml.titles = ml.movies_df["title"].values
+    ml.genres = ml.movies_df["genres"].values
+    ml.movieid_to_idx = {int(m): i for i, m in enumerate(ml.movie_ids_arr)}
+
+    ml.tfidf_matrix = _build_tfidf(ml.movies_df)
+    ml.svd_model = _load_svd_model()
+    model = ml.svd_model
+    if model is not None and model.user_map and model.item_map:
+        # Compile the Numba predict kernel here, not inside the first request
+        model.predict_batch(next(iter(model.user_map)), [next(iter(model.item_map))])
+    ml.popular_movie_ids = _load_popular_movie_ids()
+
+    # Popular movies are the onboarding choices, so they are the most common seeds
+    ml.similar_cache = LRUCache(maxsize=4096)
+    ml.precomputed_similar = _precompute_similar(ml, ml.popular_movie_ids)
+    print(f"[ML] Precomputed similar movies for {len(ml.precomputed_similar)} popular seeds")
+
+
+async def init_ml(app):
+    """Load ML data off the event loop and share it through app.state."""
+    await anyio.to_thread.run_sync(_load_ml_state, app.state)
 
 
 # ------------------------------------------------------------------
 # Helper functions
 # ------------------------------------------------------------------
-def _get_content_similar_movies(movie_id: int, top_n: int = 30) -> list[int]:
+def _top_similar(ml, idx: int, sim_scores: np.ndarray, top_n: int) -> tuple[int, ...]:
+    """Return the movieIds of the top_n highest scores, excluding the seed row idx."""
+    # Partial sort: only the top_n+1 best candidates need ordering (skip self)
+    k = min(top_n + 1, len(sim_scores))
+    candidates = np.argpartition(sim_scores, -k)[-k:]
+    candidates = candidates[np.argsort(-sim_scores[candidates], kind="stable")]
+    similar_indices = candidates[candidates != idx][:top_n]
+    return tuple(ml.movie_ids_arr[similar_indices].tolist())
+
+
+def _get_content_similar_movies(ml, movie_id: int, top_n: int = 30) -> list[int]:
     """Find top_n movies similar to movie_id based on TF-IDF genre similarity."""
-    if _tfidf_matrix is None:
+    if ml.tfidf_matrix is None:
         return []
-    idx_matches = movies_df[movies_df["movieId"] == movie_id].index
-    if len(idx_matches) == 0:
+    key = (int(movie_id), top_n)
+    cached = ml.precomputed_similar.get(key)
+    if cached is None:
+        cached = ml.similar_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    idx = ml.movieid_to_idx.get(key[0])
+    if idx is None:
         return []
 
-    idx = idx_matches[0]
-    sim_scores = cosine_similarity(_tfidf_matrix[idx], _tfidf_matrix).flatten()
-    # Get top_n+1 (skip self)
-    similar_indices = sim_scores.argsort()[::-1][1 : top_n + 1]
-    return movies_df.iloc[similar_indices]["movieId"].tolist()
+    # TF-IDF rows are L2-normalized, so a plain dot product is the cosine similarity
+    sim_scores = ml.tfidf_matrix @ ml.tfidf_matrix[idx]
+    similar = ml.similar_cache[key] = _top_similar(ml, idx, sim_scores, top_n)
+    return list(similar)
+
+
+def _precompute_similar(ml, movie_ids: list[int], top_n: int = 30) -> dict[tuple[int, int], tuple[int, ...]]:
+    """Compute similar-movie lists for many seeds with one matrix product."""
+    if ml.tfidf_matrix is None:
+        return {}
+    seeds = [(int(mid), ml.movieid_to_idx[mid]) for mid in movie_ids if mid in ml.movieid_to_idx]
+    if not seeds:
+        return {}
+    sims = ml.tfidf_matrix @ ml.tfidf_matrix[[idx for _, idx in seeds]].T
+    return {
+        (mid, top_n): _top_similar(ml, idx, sims[:, col], top_n)
+        for col, (mid, idx) in enumerate(seeds)
+    }
 
 
-def _predict_svd_ratings(user_id: int, movie_ids: list[int]) -> list[dict]:
+def _predict_svd_ratings(ml, user_id: int, movie_ids: list[int]) -> list[dict]:
     """Use SVD model to predict ratings for a list of movies."""
-    results = []
-    for mid in movie_ids:
-        movie_row = movies_df[movies_df["movieId"] == mid]
-        if movie_row.empty:
-            continue
-
-        if svd_model is not None:
-            predicted_rating = svd_model.predict(user_id, mid)
-        else:
-            predicted_rating = 3.0  # fallback if no model
-
-        row = movie_row.iloc[0]
-        results.append({
+    known = [(mid, ml.movieid_to_idx[mid]) for mid in movie_ids if mid in ml.movieid_to_idx]
+
+    if ml.svd_model is not None:
+        predicted = ml.svd_model.predict_batch(user_id, [mid for mid, _ in known]).tolist()
+    else:
+        predicted = [3.0] * len(known)  # fallback if no model
+
+    return [
+        {
             "movieId": int(mid),
-            "title": str(row["title"]),
-            "genres": str(row["genres"]),
+            "title": str(ml.titles[idx]),
+            "genres": str(ml.genres[idx]),
             "predicted_rating": predicted_rating,
-        })
-    return results
+        }
+        for (mid, idx), predicted_rating in zip(known, predicted)
+    ]
 
 
 # ------------------------------------------------------------------
 # Endpoints
 # ------------------------------------------------------------------
 @router.get("/popular")
-async def get_popular_movies(limit: int = 10):
+async def get_popular_movies(request: Request, limit: int = 10):
     """
     Return popular movies for the cold-start onboarding screen.
     These are high-rated movies with many ratings.
     """
-    selected_ids = _popular_movie_ids[:limit]
+    ml = request.app.state
+    selected_ids = ml.popular_movie_ids[:limit]
     results = []
     for mid in selected_ids:
-        row = movies_df[movies_df["movieId"] == mid]
-        if not row.empty:
-            r = row.iloc[0]
-            movie_id = int(r["movieId"])
-            title = str(r["title"])
-            poster_url = await search_poster(movie_id, title)
+        idx = ml.movieid_to_idx.get(mid)
+        if idx is not None:
             results.append({
-                "movieId": movie_id,
-                "title": title,
-                "genres": str(r["genres"]),
-                "poster_url": poster_url,
+                "movieId": int(ml.movie_ids_arr[idx]),
+                "title": str(ml.titles[idx]),
+                "genres": str(ml.genres[idx]),
             })
+
+    posters = await get_posters_batch(results)
+    for movie in results:
+        movie["poster_url"] = posters[movie["movieId"]]
     return results
 
 
 @router.post("/retrain")
-async def retrain_model(x_admin_key: str = Header(None)):
+async def retrain_model(request: Request, x_admin_key: str = Header(None)):
     """
-    Retrain the SVD model combining ratings.csv and new_ratings.json.
+    Retrain the SVD model combining ratings.csv and the app's stored ratings.
     Protected by ADMIN_SECRET_KEY environment variable.
     """
     admin_secret = os.environ.get("ADMIN_SECRET_KEY")
@@ -171,11 +243,8 @@ async def retrain_model(x_admin_key: str = Header(None)):
         train_and_save_model()
 
         # Reload the model in memory so the API uses the new one immediately
-        global svd_model
         if MODEL_PATH.exists():
-            with open(MODEL_PATH, "rb") as f:
-                svd_model = pickle.load(f)
-            print(f"[ML] Relocated updated SVD model from {MODEL_PATH}")
+            request.app.state.svd_model = _load_svd_model()
 
         return {"status": "success", "message": "Model retrained and reloaded successfully."}
     except Exception as e:
@@ -187,7 +256,7 @@ async def retrain_model(x_admin_key: str = Header(None)):
 
 
 @router.get("")
-async def get_recommendations(user: dict = Depends(get_current_user)):
+async def get_recommendations(request: Request, user: dict = Depends(get_current_user)):
     """
     Hybrid recommendation endpoint:
     1. Find a movie the user recently liked (rating >= 4.0)
@@ -195,6 +264,7 @@ async def get_recommendations(user: dict = Depends(get_current_user)):
     3. Collaborative: SVD predicted ratings for those 30
     4. Return Top 10 sorted by predicted SVD score
     """
+    ml = request.app.state
     user_id = user["id"]
     user_ratings = get_ratings_for_user(user_id)
 
@@ -213,18 +283,18 @@ async def get_recommendations(user: dict = Depends(get_current_user)):
     seed_movie_id = liked[-1]["movie_id"]  # most recently liked
 
     # Step 2: Content-based — find 30 similar movies by genre
-    similar_ids = _get_content_similar_movies(seed_movie_id, top_n=30)
+    similar_ids = _get_content_similar_movies(ml, seed_movie_id, top_n=30)
 
     if not similar_ids:
         # Fallback: use popular movies
-        similar_ids = _popular_movie_ids[:30]
+        similar_ids = ml.popular_movie_ids[:30]
 
     # Remove movies the user has already rated
     rated_ids = {r["movie_id"] for r in user_ratings}
     similar_ids = [mid for mid in similar_ids if mid not in rated_ids]
 
     # Step 3: Collaborative — predict SVD ratings
-    predictions = _predict_svd_ratings(user_id, similar_ids)
+    predictions = _predict_svd_ratings(ml, user_id, similar_ids)
 
     # Step 3.5: Fix Cold Start ties
     # If SVD doesn't know the user, it predicts the exact same global_mean for everything.
@@ -238,8 +308,9 @@ async def get_recommendations(user: dict = Depends(get_current_user)):
     top_10 = predictions[:10]
 
     # Step 5: Fetch poster URLs from TMDB
+    posters = await get_posters_batch(top_10)
     for movie in top_10:
-        movie["poster_url"] = await search_poster(movie["movieId"], movie["title"])
+        movie["poster_url"] = posters[movie["movieId"]]
 
     return {
         "user_id": user_id,
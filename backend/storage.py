@@ -1,150 +1,215 @@
 """
-JSON-based storage helpers for users and ratings.
-Thread-safe read/write using a threading lock.
+SQLite-based storage helpers for users and ratings.
+Each thread gets its own connection; the database runs in WAL mode so
+readers never block on writers. Legacy JSON files are imported once.
 """
 
 import json
-import os
+import sqlite3
 import threading
+from datetime import datetime, timezone
 from pathlib import Path
 
 DATA_DIR = Path(__file__).parent / "data"
+DB_FILE = DATA_DIR / "app.db"
+# Legacy JSON storage, imported into the database on first start
 USERS_FILE = DATA_DIR / "users.json"
 RATINGS_FILE = DATA_DIR / "new_ratings.json"
 
-_lock = threading.Lock()
-
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+# PRAGMA user_version once the legacy JSON files have been imported
+LEGACY_IMPORT_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    hashed_password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ratings (
+    user_id INTEGER NOT NULL,
+    movie_id INTEGER NOT NULL,
+    rating REAL NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ratings_user_movie ON ratings (user_id, movie_id);
+"""
 
-def _ensure_files():
-    """Create data directory and JSON files if they don't exist."""
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    if not USERS_FILE.exists():
-        USERS_FILE.write_text("[]", encoding="utf-8")
-    if not RATINGS_FILE.exists():
-        RATINGS_FILE.write_text("[]", encoding="utf-8")
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DB_FILE)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL: commits append to the log, fsync only happens at checkpoints
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # Serve reads from the shared OS page cache through a memory-mapped file
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE_BYTES}")
+    return conn
+
+
+def _import_legacy_json(conn: sqlite3.Connection):
+    """Copy users.json / new_ratings.json into the tables."""
+    if USERS_FILE.exists():
+        users = json.loads(USERS_FILE.read_text(encoding="utf-8"))
+        conn.executemany(
+            "INSERT INTO users (id, username, hashed_password) VALUES (:id, :username, :hashed_password)",
+            users,
+        )
+    if RATINGS_FILE.exists():
+        ratings = json.loads(RATINGS_FILE.read_text(encoding="utf-8"))
+        conn.executemany(
+            "INSERT INTO ratings (user_id, movie_id, rating, timestamp) "
+            "VALUES (:user_id, :movie_id, :rating, :timestamp)",
+            ratings,
+        )
+
+
+def _is_empty(conn: sqlite3.Connection) -> bool:
+    return (
+        conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+        and conn.execute("SELECT 1 FROM ratings LIMIT 1").fetchone() is None
+    )
+
+
+def _ensure_db():
+    """Create the data directory, schema and legacy import on first use."""
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
+        conn = _connect()
+        conn.isolation_level = None  # explicit transactions below
+        try:
+            conn.executescript(_SCHEMA)
+            # The write lock makes the version check and import atomic across processes;
+            # user_version records the migration in the same transaction as the import.
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] < LEGACY_IMPORT_VERSION:
+                    # Databases created before the marker existed already hold the import
+                    if _is_empty(conn):
+                        _import_legacy_json(conn)
+                    conn.execute(f"PRAGMA user_version={LEGACY_IMPORT_VERSION}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        _initialized = True
+
+
+def _get_conn() -> sqlite3.Connection:
+    """Return this thread's connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        _ensure_db()
+        conn = _local.conn = _connect()
+    return conn
 
 
 # --- Users ---
 
 def read_users() -> list[dict]:
-    """Read and return the list of users from users.json."""
-    _ensure_files()
-    with _lock:
-        with open(USERS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-
-def write_users(users: list[dict]):
-    """Overwrite users.json with the given list."""
-    _ensure_files()
-    with _lock:
-        with open(USERS_FILE, "w", encoding="utf-8") as f:
-            json.dump(users, f, indent=2, ensure_ascii=False)
+    """Return all users."""
+    rows = _get_conn().execute("SELECT id, username, hashed_password FROM users ORDER BY id")
+    return [dict(row) for row in rows]
 
 
 def get_user_by_username(username: str) -> dict | None:
     """Find a user by username. Returns None if not found."""
-    users = read_users()
-    for user in users:
-        if user["username"] == username:
-            return user
-    return None
-
-
-def get_next_user_id() -> int:
-    """Return the next available user ID."""
-    users = read_users()
-    if not users:
-        return 1
-    return max(u["id"] for u in users) + 1
+    row = _get_conn().execute(
+        "SELECT id, username, hashed_password FROM users WHERE username = ?", (username,)
+    ).fetchone()
+    return dict(row) if row is not None else None
 
 
 def add_user(username: str, hashed_password: str) -> dict:
-    """Create a new user, save to users.json, and return the user dict."""
-    users = read_users()
-    new_user = {
-        "id": get_next_user_id(),
+    """Create a new user and return the user dict."""
+    conn = _get_conn()
+    with conn:
+        cur = conn.execute(
+            "INSERT INTO users (username, hashed_password) VALUES (?, ?)",
+            (username, hashed_password),
+        )
+    return {
+        "id": cur.lastrowid,
         "username": username,
         "hashed_password": hashed_password,
     }
-    users.append(new_user)
-    write_users(users)
-    return new_user
 
 
-# --- Ratings ---
+def update_user_password(user_id: int, hashed_password: str):
+    """Replace a user's password hash (e.g. after upgrading the hashing scheme)."""
+    conn = _get_conn()
+    with conn:
+        conn.execute(
+            "UPDATE users SET hashed_password = ? WHERE id = ?", (hashed_password, user_id)
+        )
 
-def read_ratings() -> list[dict]:
-    """Read and return the list of ratings from new_ratings.json."""
-    _ensure_files()
-    with _lock:
-        with open(RATINGS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
 
+# --- Ratings ---
 
-def write_ratings(ratings: list[dict]):
-    """Overwrite new_ratings.json with the given list."""
-    _ensure_files()
-    with _lock:
-        with open(RATINGS_FILE, "w", encoding="utf-8") as f:
-            json.dump(ratings, f, indent=2, ensure_ascii=False)
+def read_ratings() -> list[dict]:
+    """Return all ratings submitted through the app."""
+    rows = _get_conn().execute("SELECT user_id, movie_id, rating, timestamp FROM ratings")
+    return [dict(row) for row in rows]
 
 
 def add_rating(user_id: int, movie_id: int, rating: float):
-    """Append a single rating to new_ratings.json."""
-    from datetime import datetime, timezone
-
-    ratings = read_ratings()
-    ratings.append({
-        "user_id": user_id,
-        "movie_id": movie_id,
-        "rating": rating,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-    })
-    write_ratings(ratings)
+    """Insert a single rating."""
+    conn = _get_conn()
+    with conn:
+        conn.execute(
+            "INSERT INTO ratings (user_id, movie_id, rating, timestamp) VALUES (?, ?, ?, ?)",
+            (user_id, movie_id, rating, datetime.now(timezone.utc).isoformat()),
+        )
 
 
 def add_ratings_batch(user_id: int, rating_list: list[dict]):
-    """Append multiple ratings at once (cold-start onboarding)."""
-    from datetime import datetime, timezone
-
-    ratings = read_ratings()
+    """Insert multiple ratings at once (cold-start onboarding)."""
     now = datetime.now(timezone.utc).isoformat()
-    for r in rating_list:
-        ratings.append({
-            "user_id": user_id,
-            "movie_id": r["movie_id"],
-            "rating": r["rating"],
-            "timestamp": now,
-        })
-    write_ratings(ratings)
+    conn = _get_conn()
+    with conn:
+        conn.executemany(
+            "INSERT INTO ratings (user_id, movie_id, rating, timestamp) VALUES (?, ?, ?, ?)",
+            ((user_id, r["movie_id"], r["rating"], now) for r in rating_list),
+        )
 
 
 def get_ratings_for_user(user_id: int) -> list[dict]:
     """Return all ratings submitted by a specific user."""
-    return [r for r in read_ratings() if r["user_id"] == user_id]
+    rows = _get_conn().execute(
+        "SELECT user_id, movie_id, rating, timestamp FROM ratings WHERE user_id = ? ORDER BY rowid",
+        (user_id,),
+    )
+    return [dict(row) for row in rows]
 
 
 def update_rating(user_id: int, movie_id: int, new_rating: float) -> bool:
     """Update an existing rating. Returns True if found and updated."""
-    ratings = read_ratings()
-    found = False
-    for r in ratings:
-        if r["user_id"] == user_id and r["movie_id"] == movie_id:
-            r["rating"] = new_rating
-            found = True
-            break
-    if found:
-        write_ratings(ratings)
-    return found
+    conn = _get_conn()
+    with conn:
+        cur = conn.execute(
+            "UPDATE ratings SET rating = ? WHERE user_id = ? AND movie_id = ?",
+            (new_rating, user_id, movie_id),
+        )
+    return cur.rowcount > 0
 
 
 def delete_rating(user_id: int, movie_id: int) -> bool:
     """Delete a rating. Returns True if found and deleted."""
-    ratings = read_ratings()
-    initial_len = len(ratings)
-    ratings = [r for r in ratings if not (r["user_id"] == user_id and r["movie_id"] == movie_id)]
-    if len(ratings) < initial_len:
-        write_ratings(ratings)
-        return True
-    return False
+    conn = _get_conn()
+    with conn:
+        cur = conn.execute(
+            "DELETE FROM ratings WHERE user_id = ? AND movie_id = ?",
+            (user_id, movie_id),
+        )
+    return cur.rowcount > 0
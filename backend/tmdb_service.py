@@ -1,6 +1,6 @@
 """
 TMDB API service for fetching movie posters.
-Uses in-memory cache to avoid repeated API calls.
+Posters and TMDB ids are cached on disk (survives restarts); details in memory.
 
 TMDB provides a free API. To get your own key:
 1. Create a free account at https://www.themoviedb.org/signup
@@ -8,8 +8,13 @@ TMDB provides a free API. To get your own key:
 3. Copy your API Key (v3 auth) and paste it below
 """
 
+import asyncio
 import re
 import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import diskcache
 import httpx
 from dotenv import load_dotenv
 
@@ -22,12 +27,56 @@ TMDB_API_KEY = os.environ.get("TMDB_API_KEY", "")
 TMDB_BASE_URL = "https://api.themoviedb.org/3"
 TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p"
 
-# In-memory cache: movieId -> poster_url
-_poster_cache: dict[int, str | None] = {}
-# In-memory cache: movieId -> tmdb_id
-_tmdb_id_cache: dict[int, int | None] = {}
+CACHE_DIR = Path(__file__).parent / "data" / "tmdb_cache"
+CACHE_EXPIRE_SECONDS = 7 * 86400  # refresh posters weekly
+
+# Disk cache, bounded to 200 MB:
+#   ("poster", movieId, size) -> poster_url, "" when TMDB has none
+#   ("tmdb_id", movieId)      -> tmdb_id, 0 when TMDB has no match
+_disk_cache = diskcache.Cache(str(CACHE_DIR), size_limit=200 * 1024 * 1024)
 # In-memory cache: movieId -> full_details_dict
 _details_cache: dict[int, dict | None] = {}
+_MISSING = object()
+
+# Shared HTTP/2 client (pool + TLS context), opened and closed by the app lifespan
+_client: httpx.AsyncClient | None = None
+
+
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(http2=True, timeout=5.0, limits=httpx.Limits(max_connections=32))
+
+
+async def open_client():
+    """Create the shared TMDB client (called at app startup)."""
+    global _client
+    if TMDB_API_KEY and _client is None:
+        _client = _new_client()
+
+
+async def close_client():
+    """Close the shared TMDB client (called at app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@asynccontextmanager
+async def _get_client():
+    """Yield the shared client, or a temporary one when used outside the app lifespan."""
+    if _client is not None:
+        yield _client
+    else:
+        async with _new_client() as client:
+            yield client
+
+
+def _cached_poster(movie_id: int, size: str):
+    """Return the cached poster URL (None if TMDB has none), or _MISSING on a cache miss."""
+    hit = _disk_cache.get(("poster", movie_id, size))
+    if hit is None or ("tmdb_id", movie_id) not in _disk_cache:
+        return _MISSING
+    return hit or None
 
 
 def _parse_title_year(title: str) -> tuple[str, str | None]:
@@ -47,50 +96,52 @@ def _parse_title_year(title: str) -> tuple[str, str | None]:
     return title.strip(), None
 
 
-async def search_poster(movie_id: int, title: str, size: str = "w500") -> str | None:
+async def search_poster(
+    movie_id: int, title: str, size: str = "w500", client: httpx.AsyncClient | None = None
+) -> str | None:
     """
     Search TMDB for a movie poster by title. Returns the full poster URL.
-    Results are cached in memory.
+    Results (and the TMDB id) are cached on disk for a week.
+    Uses the shared client unless one is passed in.
     """
     if not TMDB_API_KEY:
         return None
 
     # Check cache first
-    if movie_id in _poster_cache and movie_id in _tmdb_id_cache:
-        return _poster_cache[movie_id]
+    if (cached := _cached_poster(movie_id, size)) is not _MISSING:
+        return cached
 
-    name, year = _parse_title_year(title)
+    if client is None:
+        async with _get_client() as client:
+            return await _fetch_poster(client, movie_id, title, size)
+    return await _fetch_poster(client, movie_id, title, size)
 
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            params = {
-                "api_key": TMDB_API_KEY,
-                "query": name,
-                "include_adult": "false",
-            }
-            if year:
-                params["year"] = year
 
-            resp = await client.get(f"{TMDB_BASE_URL}/search/movie", params=params)
-            resp.raise_for_status()
-            data = resp.json()
+async def _fetch_poster(client: httpx.AsyncClient, movie_id: int, title: str, size: str) -> str | None:
+    """Query TMDB search for a poster and populate the caches."""
+    name, year = _parse_title_year(title)
 
-            results = data.get("results", [])
-            if results:
-                first_result = results[0]
-                tmdb_id = first_result.get("id")
-                _tmdb_id_cache[movie_id] = tmdb_id
-
-                poster_path = first_result.get("poster_path")
-                if poster_path:
-                    url = f"{TMDB_IMAGE_BASE}/{size}{poster_path}"
-                    _poster_cache[movie_id] = url
-                    return url
-
-        # No poster found
-        _tmdb_id_cache[movie_id] = _tmdb_id_cache.get(movie_id, None) 
-        _poster_cache[movie_id] = None
-        return None
+    try:
+        params = {
+            "api_key": TMDB_API_KEY,
+            "query": name,
+            "include_adult": "false",
+        }
+        if year:
+            params["year"] = year
+
+        resp = await client.get(f"{TMDB_BASE_URL}/search/movie", params=params)
+        resp.raise_for_status()
+        data = resp.json()
+
+        results = data.get("results", [])
+        tmdb_id = results[0].get("id") if results else None
+        poster_path = results[0].get("poster_path") if results else None
+        url = f"{TMDB_IMAGE_BASE}/{size}{poster_path}" if poster_path else None
+
+        _disk_cache.set(("tmdb_id", movie_id), tmdb_id or 0, expire=CACHE_EXPIRE_SECONDS)
+        _disk_cache.set(("poster", movie_id, size), url or "", expire=CACHE_EXPIRE_SECONDS)
+        return url
 
     except Exception as e:
         print(f"[TMDB] Error searching poster for '{title}': {e}")
@@ -99,16 +150,30 @@ async def search_poster(movie_id: int, title: str, size: str = "w500") -> str |
 
 async def get_posters_batch(movies: list[dict], size: str = "w500") -> dict[int, str | None]:
     """
-    Fetch posters for a list of movies. Each movie dict must have 'movieId' and 'title'.
+    Fetch posters for a list of movies. Cached posters are read from disk;
+    only the misses are requested from TMDB, concurrently over the shared client.
+    Each movie dict must have 'movieId' and 'title'.
     Returns a dict mapping movieId -> poster_url.
     """
-    result = {}
-    for movie in movies:
-        mid = movie["movieId"]
-        title = movie["title"]
-        poster_url = await search_poster(mid, title, size)
-        result[mid] = poster_url
-    return result
+    if not TMDB_API_KEY:
+        return {m["movieId"]: None for m in movies}
+
+    posters = {}
+    misses = {}
+    for m in movies:
+        cached = _cached_poster(m["movieId"], size)
+        if cached is _MISSING:
+            misses[m["movieId"]] = m["title"]
+        else:
+            posters[m["movieId"]] = cached
+
+    if misses:
+        async with _get_client() as client:
+            fetched = await asyncio.gather(
+                *(_fetch_poster(client, mid, title, size) for mid, title in misses.items())
+            )
+        posters.update(zip(misses, fetched))
+    return posters
 
 
 async def get_movie_details(movie_id: int, title: str) -> dict | None:
@@ -123,21 +188,21 @@ async def get_movie_details(movie_id: int, title: str) -> dict | None:
         return _details_cache[movie_id]
 
     # Ensure we have the TMDB ID by calling the search
-    if movie_id not in _tmdb_id_cache:
+    if ("tmdb_id", movie_id) not in _disk_cache:
         await search_poster(movie_id, title)
     
-    tmdb_id = _tmdb_id_cache.get(movie_id)
+    tmdb_id = _disk_cache.get(("tmdb_id", movie_id))
     if not tmdb_id:
         _details_cache[movie_id] = None
         return None
 
     try:
-        async with httpx.AsyncClient(timeout=8.0) as client:
+        async with _get_client() as client:
             params = {
                 "api_key": TMDB_API_KEY,
                 "append_to_response": "credits", # gets the cast
             }
-            resp = await client.get(f"{TMDB_BASE_URL}/movie/{tmdb_id}", params=params)
+            resp = await client.get(f"{TMDB_BASE_URL}/movie/{tmdb_id}", params=params, timeout=8.0)
             resp.raise_for_status()
             data = resp.json()
 
@@ -2,19 +2,24 @@
 Train an SVD model on the MovieLens ratings dataset.
 
 Usage:
-    python train_model.py
+    python train_model.py            # train the SVD model
+    python train_model.py --popular  # only rebuild the popular movies list
 
 Outputs:
-    models/svd_model.pkl — serialized SVD model
+    models/svd_model.pkl       — serialized SVD model
+    data/popular_movies.json   — onboarding movies (with --popular)
 """
 
 import json
 import os
 import pickle
+import sys
 import time
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
+from storage import read_ratings
 from svd_model import SVDModel
 
 # ------------------------------------------------------------------
@@ -23,17 +28,59 @@ from svd_model import SVDModel
 RATINGS_FILE = os.path.join(os.path.dirname(__file__), "..", "ratings.csv")
 MODEL_DIR = Path(__file__).parent / "models"
 MODEL_PATH = MODEL_DIR / "svd_model.pkl"
+POPULAR_PATH = Path(__file__).parent / "data" / "popular_movies.json"
 
 # SVD hyper-parameters
 N_FACTORS = 50
 N_EPOCHS = 20
 LR = 0.005
 REG = 0.02
+SOLVER = "sgd"  # "sgd" or "als"
 SAMPLE_SIZE = 500_000
 
+# Popular movies (cold-start onboarding)
+POPULAR_MIN_RATINGS = 100
+POPULAR_LIMIT = 50
+CHUNK_SIZE = 200_000
+
+
+def compute_popular_movies(
+    ratings_path=RATINGS_FILE, min_ratings=POPULAR_MIN_RATINGS, limit=POPULAR_LIMIT
+) -> list[int]:
+    """
+    Return the best-rated movieIds with at least min_ratings ratings.
+    Streams the CSV in chunks and merges per-chunk counts/sums, so memory
+    stays proportional to the number of movies, not the number of ratings.
+    """
+    totals = None
+    for chunk in pd.read_csv(
+        ratings_path,
+        usecols=["movieId", "rating"],
+        dtype={"movieId": np.int32, "rating": np.float64},
+        chunksize=CHUNK_SIZE,
+    ):
+        agg = chunk.groupby("movieId")["rating"].agg(["count", "sum"])
+        totals = agg if totals is None else totals.add(agg, fill_value=0)
+
+    if totals is None:
+        return []
+    totals = totals[totals["count"] >= min_ratings]
+    mean_rating = (totals["sum"] / totals["count"]).sort_values(ascending=False, kind="stable")
+    return [int(mid) for mid in mean_rating.index[:limit]]
+
+
+def save_popular_movies():
+    """Recompute the popular movies list and write it to data/popular_movies.json."""
+    print("Computing popular movies from ratings...")
+    popular = compute_popular_movies()
+    POPULAR_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(POPULAR_PATH, "w") as f:
+        json.dump(popular, f)
+    print(f"  Saved {len(popular)} popular movies to {POPULAR_PATH}")
+
 
 def train_and_save_model():
-    """Train SVD model and save it to disk. Combines base ratings and new json ratings."""
+    """Train SVD model and save it to disk. Combines base ratings and new app ratings."""
     print("=" * 60)
     print("  SVD Model Training Pipeline")
     print("=" * 60)
@@ -42,20 +89,17 @@ def train_and_save_model():
     print("\n[1/3] Loading ratings data...")
     df = pd.read_csv(RATINGS_FILE, usecols=["userId", "movieId", "rating"])
     
-    # Load new ratings from json
-    new_ratings_path = Path(__file__).parent / "data" / "new_ratings.json"
-    if new_ratings_path.exists():
-        try:
-            with open(new_ratings_path, "r", encoding="utf-8") as f:
-                new_ratings_data = json.load(f)
-            if new_ratings_data:
-                # Rename keys to match dataframe
-                new_df = pd.DataFrame(new_ratings_data)
-                new_df = new_df.rename(columns={"user_id": "userId", "movie_id": "movieId"})
-                df = pd.concat([df, new_df[["userId", "movieId", "rating"]]], ignore_index=True)
-                print(f"  Added {len(new_df)} new ratings from json.")
-        except Exception as e:
-            print(f"  Warning: failed to read {new_ratings_path}: {e}")
+    # Load new ratings submitted through the app
+    try:
+        new_ratings_data = read_ratings()
+        if new_ratings_data:
+            # Rename keys to match dataframe
+            new_df = pd.DataFrame(new_ratings_data)
+            new_df = new_df.rename(columns={"user_id": "userId", "movie_id": "movieId"})
+            df = pd.concat([df, new_df[["userId", "movieId", "rating"]]], ignore_index=True)
+            print(f"  Added {len(new_df)} new ratings from the app database.")
+    except Exception as e:
+        print(f"  Warning: failed to read app ratings: {e}")
 
     print(f"  Total ratings: {len(df):,}")
 
@@ -68,7 +112,8 @@ def train_and_save_model():
     print("\n[2/3] Training SVD model...")
     start = time.time()
     model = SVDModel(n_factors=N_FACTORS, n_epochs=N_EPOCHS, lr=LR, reg=REG)
-    model.fit(
+    fit = model.fit_als if SOLVER == "als" else model.fit
+    fit(
         user_ids=df["userId"].values,
         item_ids=df["movieId"].values,
         ratings=df["rating"].values,
@@ -95,4 +140,7 @@ def train_and_save_model():
 
 
 if __name__ == "__main__":
-    train_and_save_model()
+    if "--popular" in sys.argv[1:]:
+        save_popular_movies()
+    else:
+        train_and_save_model()